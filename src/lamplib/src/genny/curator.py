@@ -95,7 +95,7 @@ def _cleanup_metrics():
     if not os.path.exists(_METRICS_PATH):
         return
     uuid = str(uuid4())[:8]
-    ts = datetime.datetime.utcnow().strftime(_DATE_FORMAT)
+    ts = datetime.datetime.now(datetime.timezone.utc).strftime(_DATE_FORMAT)
     dest = f"{_METRICS_PATH}-{ts}-{uuid}"
     shutil.move(_METRICS_PATH, dest)
     SLOG.info(
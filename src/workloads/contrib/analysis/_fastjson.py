@@ -0,0 +1,33 @@
+"""
+JSON helpers shared by the analysis scripts.
+
+Uses orjson when it is installed since it is much faster than the standard library, and falls back
+to the standard json module otherwise so the scripts still run without it.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson.JSONDecodeError is a subclass of this, so callers can catch it either way.
+JSONDecodeError = json.JSONDecodeError
+
+if orjson:
+    def loads(data):
+        return orjson.loads(data)
+
+    def dumps(obj, pretty=False):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0).decode()
+else:
+    def loads(data):
+        return json.loads(data)
+
+    # Use the same separators and non-ASCII handling as orjson. The backends still differ for
+    # non-finite floats (orjson writes null, json writes NaN/Infinity) and in float spelling
+    # (1e20 vs 1e+20).
+    def dumps(obj, pretty=False):
+        if pretty:
+            return json.dumps(obj, ensure_ascii=False, indent=2)
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
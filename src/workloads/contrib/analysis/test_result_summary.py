@@ -16,6 +16,8 @@ import time
 
 from tqdm import tqdm
 
+import _fastjson
+
 default_metrics_path = 'build/WorkloadOutput/CedarMetrics'
 default_metrics = ['throughput', 'timers.dur', 'errors']
 
@@ -274,8 +276,8 @@ def process_json(args, actor_name, json_reader):
         n_rows += 1
         recording = None
         try:
-            recording = json.loads(raw_recording)
-        except json.JSONDecodeError:
+            recording = _fastjson.loads(raw_recording)
+        except _fastjson.JSONDecodeError:
             print(f"Found invalid json: {raw_recording}")
             raise
         last_line = recording
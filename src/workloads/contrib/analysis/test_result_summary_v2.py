@@ -1,74 +1,141 @@
+import argparse
+import functools
+import itertools
 import os
 import subprocess
-import json
 import sys
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
-# Fields to extract and conversion mapping
+import _fastjson
+
+# Fields to extract and the divisor applied to each value
 FIELDS_TO_EXTRACT = {
-    "AverageLatency": lambda v: v / 1_000_000,
-    "OperationThroughput": lambda v: v,
-    "ErrorRate": lambda v: v,
-    "Latency50thPercentile": lambda v: v / 1_000_000,
-    "Latency80thPercentile": lambda v: v / 1_000_000,
-    "Latency90thPercentile": lambda v: v / 1_000_000,
-    "Latency95thPercentile": lambda v: v / 1_000_000,
-    "Latency99thPercentile": lambda v: v / 1_000_000,
-    "LatencyMin": lambda v: v / 1_000_000,
-    "LatencyMax": lambda v: v / 1_000_000,
-    "DurationTotal": lambda v: v / 1_000_000_000,
-    "ErrorsTotal": lambda v: v,
-    "OperationsTotal": lambda v: v,
-    "DocumentsTotal": lambda v: v,
+    "AverageLatency": 1_000_000,
+    "OperationThroughput": 1,
+    "ErrorRate": 1,
+    "Latency50thPercentile": 1_000_000,
+    "Latency80thPercentile": 1_000_000,
+    "Latency90thPercentile": 1_000_000,
+    "Latency95thPercentile": 1_000_000,
+    "Latency99thPercentile": 1_000_000,
+    "LatencyMin": 1_000_000,
+    "LatencyMax": 1_000_000,
+    "DurationTotal": 1_000_000_000,
+    "ErrorsTotal": 1,
+    "OperationsTotal": 1,
+    "DocumentsTotal": 1,
 }
 
-def process_ftdc_files(ftdc_dir, curator_path):
-    result_map = {}
-    for filename in os.listdir(ftdc_dir):
-        if not filename.endswith(".ftdc"):
-            continue
+def _process_one(entry, curator_args):
+    filename = entry.name
+    file_path = entry.path
+    base_name = filename[:-5]  # Remove .ftdc
 
-        file_path = os.path.join(ftdc_dir, filename)
-        base_name = filename[:-5]  # Remove .ftdc
-        output_path = f"/tmp/{base_name}.output"
+    # Curator produces invalid results for empty files, so don't spend a process on them.
+    if entry.stat().st_size == 0:
+        return None
 
-        # Run the curator command
-        try:
-            subprocess.run([
-                os.path.join(curator_path, "curator"),
-                "calculate-rollups",
-                "--inputFile", file_path,
-                "--outputFile", output_path
-            ], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        except subprocess.CalledProcessError:
-            print(f"Error running curator on {filename}")
-            continue
+    # Run the curator command. Each call writes to its own temp file, which is portable and keeps
+    # the rollups separate from anything curator logs to stdout.
+    fd, output_path = tempfile.mkstemp(prefix=f"{base_name}.", suffix=".output")
+    os.close(fd)
+    try:
+        res = subprocess.run(
+            curator_args + ["--inputFile", file_path, "--outputFile", output_path],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if res.returncode != 0:
+            stderr = res.stderr.decode(errors="replace").strip()
+            print(f"Error running curator on {filename}: {stderr}", file=sys.stderr)
+            return None
+        with open(output_path, "rb") as f:
+            data = f.read()
+    finally:
+        os.remove(output_path)
 
-        # Read and filter the output
-        try:
-            with open(output_path, "r") as f:
-                output_data = json.load(f)
-                filtered = {}
+    # Read and filter the output
+    try:
+        output_data = _fastjson.loads(data)
+        filtered = {}
+        divisor_of = FIELDS_TO_EXTRACT.get
 
-                for item in output_data:
-                    name = item.get("Name")
-                    if name in FIELDS_TO_EXTRACT:
-                        value = item.get("Value")
-                        filtered[name] = round(FIELDS_TO_EXTRACT[name](value), 3)
+        for item in output_data:
+            name = item.get("Name")
+            divisor = divisor_of(name)
+            if divisor is not None:
+                value = item["Value"]
+                # Leave unscaled values alone so integer totals stay integers.
+                if divisor != 1:
+                    value = value / divisor
+                filtered[name] = round(value, 3)
 
-                result_map[base_name] = filtered
-        except Exception as e:
-            print(f"Error reading/parsing output for {filename}: {e}")
-            continue
+        return base_name, filtered
+    except Exception as e:
+        print(f"Error reading/parsing output for {filename}: {e}", file=sys.stderr)
+        return None
 
-    print(json.dumps(result_map, indent=2))
+def _results_as_completed(executor, fn, items, max_in_flight):
+    """
+    Yield fn(item) for each item in completion order, with at most max_in_flight items submitted
+    but not yet yielded, so finished results don't pile up waiting to be read.
+    """
+    items = iter(items)
+    pending = {executor.submit(fn, item) for item in itertools.islice(items, max_in_flight)}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result()
+        # Top back up with as many new items as just finished.
+        pending.update(executor.submit(fn, item) for item in itertools.islice(items, len(done)))
 
-if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python script.py <ftdc_directory> <curator_directory>")
-        sys.exit(1)
+def process_ftdc_files(ftdc_dir, curator_path, stream=False):
+    result_map = {}
+    with os.scandir(ftdc_dir) as it:
+        entries = [entry for entry in it if entry.name.endswith(".ftdc") and entry.is_file()]
+    # Start the largest files first so a big file doesn't end up running alone at the end.
+    entries.sort(key=lambda entry: (-entry.stat().st_size, entry.name))
 
-    ftdc_directory = sys.argv[1]
-    curator_directory = sys.argv[2]
+    # The arguments shared by every curator invocation; each file appends its own input and output.
+    curator_args = [os.path.join(curator_path, "curator"), "calculate-rollups"]
 
-    process_ftdc_files(ftdc_directory, curator_directory)
+    # Each file is processed by its own curator subprocess, so threads are enough to run
+    # them concurrently.
+    workers = os.cpu_count() or 1
+    run_one = functools.partial(_process_one, curator_args=curator_args)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        if stream:
+            # Keep the workers fed without holding more than a couple of results per worker.
+            results = _results_as_completed(executor, run_one, entries, 2 * workers)
+        else:
+            results = executor.map(run_one, entries)
+        for result in results:
+            if result is None:
+                continue
+            base_name, filtered = result
+            if stream:
+                # One JSON object per line, written as soon as the file is done.
+                sys.stdout.write(_fastjson.dumps({base_name: filtered}) + "\n")
+                sys.stdout.flush()
+            else:
+                result_map[base_name] = filtered
+
+    if not stream:
+        # Files ran largest-first; print them by name so the summary is easy to scan.
+        print(_fastjson.dumps(dict(sorted(result_map.items())), pretty=True))
 
+def parse_args():
+    parser = argparse.ArgumentParser(
+        prog='test_result_summary_v2.py',
+        description="Summarize the curator rollups of every .ftdc file in a directory as JSON.")
+    parser.add_argument('ftdc_directory', help="The directory containing the .ftdc files.")
+    parser.add_argument('curator_directory', help="The directory containing the curator binary.")
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help="""Print one JSON object per file as it completes (newline-delimited JSON) instead of
+             a single JSON object once every file is done.""")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    process_ftdc_files(args.ftdc_directory, args.curator_directory, stream=args.stream)